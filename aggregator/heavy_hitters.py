@@ -0,0 +1,217 @@
+"""
+heavy_hitters.py
+
+商品IDの出現回数を固定メモリで近似集計するモジュール（Space-Saving アルゴリズム）
+
+この構造は以下の責任を持つ：
+1. 商品IDを1件ずつ受け取り、最大 capacity 件のカウンタだけを保持して集計する
+2. 複数ワーカーの集計結果（スケッチ）をマージし、JSONで保存・読み込みする
+3. 上位 k 件を count_normalized_urls() と同じ「商品ID / 登場回数」のDataFrameで返す
+
+誤差の保証（N = これまでに受け取ったID総数）：
+- 各カウンタは真の出現回数を過大評価するだけで、過小評価はしない
+  （真の回数 ∈ [登場回数 - 誤差, 登場回数]）
+- 誤差は常に N / capacity 以下
+- 真の出現回数が N / capacity を超える商品は必ずカウンタに残る
+- マージ後も同じ保証が N = 全ワーカーの合計、capacity = 入力の最小容量で成り立つ
+したがって上位 k 件が目的なら capacity は k の10倍程度を目安にする。
+"""
+
+import heapq
+import json
+from pathlib import Path
+
+
+class SpaceSaving:
+    """
+    Space-Saving による heavy hitter 集計
+
+    Parameters:
+        capacity (int): 保持するカウンタ数の上限（メモリ使用量はこれに比例）
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity は1以上を指定してください")
+        self.capacity = capacity
+        self.n = 0
+        self.counts: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        # (count, item) の最小ヒープ。countが古いエントリは取り出し時に読み飛ばす
+        self._heap: list[tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    # --- 更新 ---
+
+    def update(self, item: str, count: int = 1) -> None:
+        """
+        商品IDを count 回分加算する
+        """
+        self.n += count
+
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            # --- 最小カウンタを追い出して引き継ぐ ---
+            min_count, victim = self._pop_min()
+            del self.counts[victim]
+            del self.errors[victim]
+            self.counts[item] = min_count + count
+            self.errors[item] = min_count
+
+        heapq.heappush(self._heap, (self.counts[item], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def update_many(self, items) -> "SpaceSaving":
+        """
+        イテラブルから商品IDを順に加算する（リストを保持しない）
+        """
+        for item in items:
+            self.update(item)
+        return self
+
+    def _pop_min(self) -> tuple[int, str]:
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return count, item
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [(c, i) for i, c in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def min_count(self) -> int:
+        """
+        カウンタが満杯なら最小の登場回数、空きがあれば 0 を返す
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    # --- マージ ---
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """
+        2つのスケッチを統合した新しいスケッチを返す（容量は小さい方）
+
+        片方にしか無い商品は、もう片方の最小カウンタ分だけ出現していた可能性があるため
+        その値を登場回数・誤差の両方に加える（Agarwal et al., Mergeable Summaries）。
+        容量を小さい方に揃えるのは、追い出しを経験した入力があれば統合結果も必ず満杯になり、
+        以降のマージで min_count() が 0 を返して誤差保証が崩れるのを防ぐため。
+        """
+        merged = SpaceSaving(min(self.capacity, other.capacity))
+        merged.n = self.n + other.n
+
+        m1, m2 = self.min_count(), other.min_count()
+        rows = []
+        for item in self.counts.keys() | other.counts.keys():
+            count = self.counts.get(item, m1) + other.counts.get(item, m2)
+            error = self.errors.get(item, m1) + other.errors.get(item, m2)
+            rows.append((count, error, item))
+
+        for count, error, item in heapq.nlargest(merged.capacity, rows):
+            merged.counts[item] = count
+            merged.errors[item] = error
+        merged._rebuild_heap()
+        return merged
+
+    # --- 参照 ---
+
+    def top(self, k: int | None = None) -> list[tuple[str, int, int]]:
+        """
+        登場回数の多い順に (商品ID, 登場回数, 誤差) を返す（k 省略時は全件）
+        """
+        if k is not None and k < 1:
+            raise ValueError("k は1以上を指定してください")
+        rows = sorted(
+            self.counts.items(),
+            key=lambda kv: (-kv[1], self.errors[kv[0]], kv[0]),
+        )
+        return [(item, count, self.errors[item]) for item, count in rows[:k]]
+
+    def error_bound(self) -> float:
+        """
+        各カウンタの過大評価の上限（N / capacity）
+        """
+        return self.n / self.capacity
+
+    # --- 保存・読み込み ---
+
+    def to_dict(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "n": self.n,
+            "counts": {item: [count, self.errors[item]] for item, count in self.counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SpaceSaving":
+        sketch = cls(int(data["capacity"]))
+        sketch.n = int(data["n"])
+        for item, (count, error) in data["counts"].items():
+            sketch.counts[item] = int(count)
+            sketch.errors[item] = int(error)
+        sketch._rebuild_heap()
+        return sketch
+
+    def save(self, path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        return path
+
+    @classmethod
+    def load(cls, path) -> "SpaceSaving":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def merge_sketches(sketches) -> SpaceSaving:
+    """
+    複数ワーカーのスケッチを1つに統合する
+    """
+    sketches = list(sketches)
+    if not sketches:
+        raise ValueError("マージ対象のスケッチがありません")
+    merged = sketches[0]
+    for s in sketches[1:]:
+        merged = merged.merge(s)
+    return merged
+
+
+def rank_top_k(sketch: SpaceSaving, k: int, log=None):
+    """
+    スケッチの上位 k 件を count_normalized_urls() と同じ形のDataFrameで返す
+
+    Parameters:
+        sketch (SpaceSaving): 集計済みスケッチ
+        k (int): 出力件数（1以上）
+        log (function, optional): ログ出力関数
+
+    Returns:
+        pd.DataFrame: 商品ID / 登場回数 のDataFrame（降順）
+    """
+    import pandas as pd
+
+    if k is None or k < 1:
+        raise ValueError("k は1以上を指定してください")
+
+    top = sketch.top(k)
+    if log:
+        log("🟡 rank_top_k() 開始")
+        log(f"📥 入力ID総数: {sketch.n} / 保持カウンタ数: {len(sketch)}（上限 {sketch.capacity}）")
+        log(f"📐 登場回数の誤差上限: +{sketch.error_bound():.1f}（N / capacity）")
+        max_err = max((err for _, _, err in top), default=0)
+        log(f"📏 出力 {len(top)} 件中の最大誤差: +{max_err}")
+
+    df = pd.DataFrame([(item, count) for item, count, _ in top], columns=["商品ID", "登場回数"])
+    if log:
+        log(f"📄 出力行数: {len(df)}")
+    return df
@@ -0,0 +1,140 @@
+"""
+bench_html_parsing.py
+HTML解析バックエンドの速度比較ベンチマーク
+
+このスクリプトは以下の責任を持つ：
+1. 従来の処理（BeautifulSoup(html, "html.parser") で全体を木構造化）を基準として計測
+2. parser.html_backend の各バックエンド（selectolax / lxml / bs4）を同じ入力で計測
+3. 投稿リンク抽出・og:title抽出・title抽出それぞれの所要時間と速度比を表示
+
+実行方法（リポジトリ直下から）：
+    python -m bench.bench_html_parsing
+    python -m bench.bench_html_parsing --tag-html html_dump/xxx.html --product-html page.html
+
+HTMLファイルを指定しない場合は、実ページに近い規模の合成HTMLを使う。
+"""
+
+import argparse
+import timeit
+from pathlib import Path
+
+from parser.html_backend import BACKENDS, _is_available, select_og_title, select_post_hrefs, select_title
+
+
+def make_tag_page(posts: int = 300, filler: int = 40) -> str:
+    """
+    タグページ相当の合成HTML（投稿リンク＋大量の装飾要素）を生成する
+    """
+    head = "<head><title>#楽天room • Instagram</title>" + "<script>var x=1;</script>" * 50 + "</head>"
+    blocks = []
+    for i in range(posts):
+        noise = "".join(
+            f'<div class="x1n2onr6 x{j}"><span class="x193iq5w">label {j}</span>'
+            f'<a href="/explore/tags/t{j}/">#t{j}</a></div>'
+            for j in range(filler)
+        )
+        blocks.append(f'<article><a href="/p/C{i:09d}/"><img src="/img/{i}.jpg" alt="post {i}"></a>{noise}</article>')
+    return f"<html>{head}<body><main>{''.join(blocks)}</main></body></html>"
+
+
+def make_product_page(body_items: int = 3000) -> str:
+    """
+    商品ページ相当の合成HTML（小さなhead＋巨大なbody）を生成する
+    """
+    head = (
+        "<head><meta charset='utf-8'><title>【楽天市場】テスト商品</title>"
+        '<meta property="og:title" content="テスト商品 ふわふわタオル 3枚セット">'
+        + "<link rel='stylesheet' href='/a.css'>" * 20
+        + "</head>"
+    )
+    body = "".join(
+        f'<div class="item"><span>商品説明 {i}</span><a href="/item/{i}">関連商品 {i}</a><table><tr><td>{i}</td></tr></table></div>'
+        for i in range(body_items)
+    )
+    return f"<html>{head}<body>{body}</body></html>"
+
+
+# 合成ページ以外でも従来処理と結果が一致するかを確認する入力
+EDGE_CASES = {
+    "XHTML（XML宣言付き）": (
+        '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE html>'
+        '<html xmlns="http://www.w3.org/1999/xhtml"><head><title>商品A</title>'
+        '<meta property="og:title" content="商品A 公式"/></head>'
+        '<body><a href="/p/X1/">x</a></body></html>'
+    ),
+    "コメントのみ": "<!-- empty page -->",
+    "空文字": "",
+    "headなし": '<title>見出し</title><meta property="og:title" content=""><a href="/p/Y/">y</a>',
+}
+
+
+# --- 従来処理（変更前の get_post_links / fetch_title_from_url と同等） ---
+
+def legacy_post_hrefs(html: str) -> list[str]:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    return [a["href"] for a in soup.find_all("a", href=True) if a["href"].startswith("/p/")]
+
+
+def legacy_og_title(html: str):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    tag = soup.find("meta", property="og:title")
+    return tag.get("content", "") if tag else None
+
+
+def legacy_title(html: str):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    return soup.title.string if soup.title else None
+
+
+def measure(func, html: str, repeat: int) -> float:
+    """
+    1回あたりの最短所要時間（秒）を返す
+    """
+    return min(timeit.repeat(lambda: func(html), number=1, repeat=repeat))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="HTML解析バックエンドの速度比較")
+    ap.add_argument("--tag-html", help="タグページのHTMLファイル（省略時は合成HTML）")
+    ap.add_argument("--product-html", help="商品ページのHTMLファイル（省略時は合成HTML）")
+    ap.add_argument("--repeat", type=int, default=5, help="計測回数（最短値を採用）")
+    args = ap.parse_args()
+
+    tag_html = Path(args.tag_html).read_text(encoding="utf-8") if args.tag_html else make_tag_page()
+    product_html = Path(args.product_html).read_text(encoding="utf-8") if args.product_html else make_product_page()
+    print(f"タグページ: {len(tag_html):,} 文字 / 商品ページ: {len(product_html):,} 文字\n")
+
+    cases = [
+        ("投稿リンク", tag_html, legacy_post_hrefs, select_post_hrefs),
+        ("og:title", product_html, legacy_og_title, select_og_title),
+        ("title", product_html, legacy_title, select_title),
+    ]
+    backends = [b for b in BACKENDS if _is_available(b)]
+
+    # --- 境界ケースで従来処理と一致するか確認 ---
+    for case, html in EDGE_CASES.items():
+        for _, _, legacy, query in cases:
+            for b in backends:
+                assert query(html, backend=b) == legacy(html), f"{case}: {b} の結果が従来処理と一致しません"
+    print(f"境界ケース {len(EDGE_CASES)} 件: 全バックエンドが従来処理と一致\n")
+
+    for label, html, legacy, query in cases:
+        base = measure(legacy, html, args.repeat)
+        print(f"[{label}]")
+        print(f"  {'従来(bs4全体)':<14} {base * 1000:9.2f} ms   x1.0")
+        for b in backends:
+            # 結果が従来処理と一致することも確認する
+            assert query(html, backend=b) == legacy(html), f"{label}: {b} の結果が従来処理と一致しません"
+            t = measure(lambda h: query(h, backend=b), html, args.repeat)
+            print(f"  {b:<14} {t * 1000:9.2f} ms   x{base / t:.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+capture_feed.py
+
+タグページのスクロール中にブラウザが受信するフィード応答（JSON）を横取りし、
+投稿ID（shortcode）と本文をDOM解析・投稿ページ遷移なしで取得するモジュール
+
+このモジュールは以下の責任を持つ：
+1. performance ログ（DevTools の Network イベント）からフィード応答を特定する
+2. Network.getResponseBody で応答本文を取得し、parser.feed_payload で投稿を取り出す
+3. スクロールしながら投稿を集め、本文を取得できなかった投稿はURLだけ返す
+   （呼び出し側で従来どおり投稿ページから本文を取得する）
+4. 受信した応答本文を record_dir に保存し、feed_replay_server で再生できるようにする
+
+driver は create_edge_driver(capture_network=True) または
+login_and_get_driver(..., capture_network=True) で起動したものを使う。
+"""
+
+import base64
+import json
+import time
+from pathlib import Path
+
+from parser.feed_payload import iter_feed_posts
+from parser.html_backend import select_post_hrefs
+
+INSTAGRAM_BASE_URL = "https://www.instagram.com"
+
+# フィード応答とみなすURLの一部（タグページの追加読み込みは v1 API / GraphQL）
+FEED_URL_KEYS = ("/api/v1/", "/graphql")
+
+
+def _is_feed_response(response: dict) -> bool:
+    url = response.get("url", "")
+    mime = response.get("mimeType", "")
+    return any(key in url for key in FEED_URL_KEYS) and ("json" in mime or "javascript" in mime)
+
+
+class FeedCapture:
+    """
+    performance ログからフィード応答を読み取り、新しく見つかった投稿を返す
+
+    Parameters:
+        driver (WebDriver): performance ログを有効にしたWebDriver
+        log (function): ログ出力関数
+        record_dir (str or Path, optional): 応答本文の保存先（再生テスト用）
+    """
+
+    def __init__(self, driver, log, record_dir=None):
+        self.driver = driver
+        self.log = log
+        self.record_dir = Path(record_dir) if record_dir else None
+        self.seen: set[str] = set()
+        self.payload_count = 0
+        self._pending: dict[str, str] = {}  # requestId → URL
+
+    def start(self) -> None:
+        """
+        Networkイベントを有効にし、これまでのログを読み捨てる
+        """
+        self.driver.execute_cdp_cmd("Network.enable", {})
+        self.driver.get_log("performance")
+        if self.record_dir:
+            self.record_dir.mkdir(parents=True, exist_ok=True)
+
+    def _response_body(self, request_id: str) -> str | None:
+        try:
+            res = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception as e:
+            self.log(f"⚠️ 応答本文の取得に失敗 ▶ {type(e).__name__}: {e}")
+            return None
+        body = res.get("body", "")
+        if res.get("base64Encoded"):
+            body = base64.b64decode(body).decode("utf-8", errors="replace")
+        return body
+
+    def poll(self) -> list[dict]:
+        """
+        前回以降のログを読み、新しく見つかった投稿を返す
+
+        Returns:
+            list[dict]: [{'shortcode': 投稿ID, 'caption': 本文（無ければ None）}]
+        """
+        found = []
+        for entry in self.driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError, TypeError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            request_id = params.get("requestId")
+
+            if method == "Network.responseReceived":
+                if _is_feed_response(params.get("response", {})):
+                    self._pending[request_id] = params["response"]["url"]
+
+            elif method == "Network.loadingFailed":
+                self._pending.pop(request_id, None)
+
+            elif method == "Network.loadingFinished" and request_id in self._pending:
+                url = self._pending.pop(request_id)
+                body = self._response_body(request_id)
+                if body is None:
+                    continue
+
+                self.payload_count += 1
+                if self.record_dir:
+                    (self.record_dir / f"feed_{self.payload_count:04d}.json").write_text(body, encoding="utf-8")
+
+                new = 0
+                for post in iter_feed_posts(body):
+                    if post["shortcode"] not in self.seen:
+                        self.seen.add(post["shortcode"])
+                        found.append(post)
+                        new += 1
+                self.log(f"📡 フィード応答を取得: {url}（新規投稿 {new} 件）")
+        return found
+
+
+def capture_tag_posts(driver, tag: str, log, max_posts: int = 5, max_scrolls: int = 10,
+                      base_url: str = INSTAGRAM_BASE_URL, record_dir=None) -> list[dict]:
+    """
+    タグページをスクロールしながらフィード応答を取得し、投稿URLと本文を返す
+
+    Parameters:
+        driver (WebDriver): performance ログを有効にしたWebDriver
+        tag (str): 対象ハッシュタグ
+        log (function): ログ出力関数
+        max_posts (int): 取得件数の上限
+        max_scrolls (int): スクロール回数の上限
+        base_url (str): タグページのベースURL（再生テスト時はローカルサーバ）
+        record_dir (str or Path, optional): 応答本文の保存先
+
+    Returns:
+        list[dict]: [{'url': 投稿URL, 'text': 本文}]（応答に含まれず本文未取得の投稿は text=None）
+    """
+    log("🟡 capture_tag_posts() 開始")
+
+    capture = FeedCapture(driver, log, record_dir=record_dir)
+    capture.start()
+
+    # --- タグページにアクセス ---
+    url = f"{base_url}/explore/tags/{tag}/"
+    log(f"🌐 タグページへアクセス中（通信キャプチャ）: {url}")
+    driver.get(url)
+    time.sleep(5)  # 初回読み込みを待機
+
+    posts = capture.poll()
+
+    # --- 必要件数に達するか、新しい投稿が出なくなるまでスクロール ---
+    idle = 0
+    for i in range(max_scrolls):
+        if len(posts) >= max_posts or idle >= 2:
+            break
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        time.sleep(2)
+        new = capture.poll()
+        idle = 0 if new else idle + 1
+        posts.extend(new)
+        log(f"↕️ スクロール ({i+1}/{max_scrolls}) ▶ 取得済み投稿 {len(posts)} 件")
+
+    # 応答に含まれていた投稿は本文なし（caption=None）でも確認済みとして "" を入れる
+    result = [{"url": f"{base_url}/p/{p['shortcode']}/", "text": p["caption"] or ""} for p in posts]
+
+    # --- 応答に含まれず画面にだけある投稿（初期表示分など）はURLのみ追加 ---
+    for href in select_post_hrefs(driver.page_source):
+        parts = href.strip("/").split("/")
+        shortcode = parts[1] if len(parts) > 1 else ""
+        if shortcode and shortcode not in capture.seen:
+            capture.seen.add(shortcode)
+            result.append({"url": f"{base_url}{href}", "text": None})
+
+    result = result[:max_posts]
+    with_text = sum(1 for r in result if r["text"] is not None)
+    log(f"✅ 通信キャプチャ完了: 応答 {capture.payload_count} 件 / 投稿 {len(result)} 件"
+        f"（本文取得済み {with_text} 件, 投稿ページ確認が必要 {len(result) - with_text} 件）")
+    return result
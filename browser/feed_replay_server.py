@@ -0,0 +1,146 @@
+"""
+feed_replay_server.py
+
+記録済みのフィード応答（JSON）を再生するローカルHTTPサーバ（通信キャプチャの動作確認用）
+
+この構造は以下の責任を持つ：
+1. /explore/tags/<tag>/ でタグページ風のHTMLを返す
+   ページ内のJSは、読み込み時とスクロールのたびに次のフィード応答を fetch する
+2. /api/v1/replay/<n> で記録済み応答を順番に返す（application/json）
+   → ブラウザの performance ログにはInstagram実ページと同じく Network イベントが残る
+3. /p/<shortcode>/ で投稿ページ風のHTMLを返す（本文未取得時の投稿ページ確認用）
+
+実行方法（リポジトリ直下から）：
+    python main.py crawl --capture --record-feed recorded/   # 実ページで応答を記録
+    python -m browser.feed_replay_server recorded/ --port 8000
+
+確認用コード例：
+    driver = create_edge_driver(capture_network=True)
+    posts = capture_tag_posts(driver, "test", log, max_posts=30, base_url="http://127.0.0.1:8000")
+"""
+
+import argparse
+import html
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from parser.feed_payload import iter_feed_posts
+
+TAG_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>#{tag} • replay</title></head>
+<body>
+<main id="feed"></main>
+<script>
+let next = 0, loading = false;
+const total = {total};
+async function loadNext() {{
+  if (loading || next >= total) return;
+  loading = true;
+  const res = await fetch("/api/v1/replay/" + next++);
+  await res.text();
+  const block = document.createElement("div");
+  block.style.height = "2000px";
+  block.textContent = "page " + next;
+  document.getElementById("feed").appendChild(block);
+  loading = false;
+}}
+window.addEventListener("scroll", () => {{
+  if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 100) loadNext();
+}});
+loadNext();
+</script>
+</body></html>
+"""
+
+POST_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{shortcode}</title></head>
+<body><span class="x193iq5w">{caption}</span></body></html>
+"""
+
+
+def _make_handler(payloads: list[bytes], captions: dict[str, str]):
+    """
+    payloads / captions を参照するリクエストハンドラクラスを生成する
+    """
+
+    class ReplayHandler(BaseHTTPRequestHandler):
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+
+            m = re.fullmatch(r"/explore/tags/([^/]+)/?", path)
+            if m:
+                page = TAG_PAGE.format(tag=html.escape(m.group(1)), total=len(payloads))
+                self._send(200, page.encode("utf-8"), "text/html; charset=utf-8")
+                return
+
+            m = re.fullmatch(r"/api/v1/replay/(\d+)", path)
+            if m and int(m.group(1)) < len(payloads):
+                self._send(200, payloads[int(m.group(1))], "application/json; charset=utf-8")
+                return
+
+            m = re.fullmatch(r"/p/([^/]+)/?", path)
+            if m and m.group(1) in captions:
+                page = POST_PAGE.format(shortcode=m.group(1), caption=html.escape(captions[m.group(1)]))
+                self._send(200, page.encode("utf-8"), "text/html; charset=utf-8")
+                return
+
+            self._send(404, b"not found", "text/plain")
+
+        def log_message(self, format, *args):
+            pass
+
+    return ReplayHandler
+
+
+def serve(record_dir, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+    """
+    record_dir 内の *.json をファイル名順に再生するサーバを生成する（serve_forever は呼び出し側）
+
+    Parameters:
+        record_dir (str or Path): FeedCapture の record_dir、または手動で用意した応答JSONの置き場
+        host (str): 待ち受けアドレス
+        port (int): 待ち受けポート（0 なら空きポート）
+
+    Returns:
+        ThreadingHTTPServer: 起動前のサーバ（server.server_address でポートを確認できる）
+    """
+    files = sorted(Path(record_dir).glob("*.json"))
+    payloads = [f.read_bytes() for f in files]
+
+    captions = {}
+    for body in payloads:
+        for post in iter_feed_posts(body):
+            captions.setdefault(post["shortcode"], post["caption"] or "")
+
+    return ThreadingHTTPServer((host, port), _make_handler(payloads, captions))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="記録済みフィード応答の再生サーバ")
+    ap.add_argument("record_dir", help="応答JSON（*.json）を置いたディレクトリ")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    args = ap.parse_args()
+
+    server = serve(args.record_dir, args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"📡 再生サーバ起動: http://{host}:{port}/explore/tags/test/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
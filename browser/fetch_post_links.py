@@ -11,8 +11,8 @@ Instagramタグページから投稿リンク一覧を収集するモジュー
 """
 
 import time
-from bs4 import BeautifulSoup
 from selenium.webdriver.edge.webdriver import WebDriver
+from parser.html_backend import resolve_backend, select_post_hrefs
 
 def get_post_links(driver: WebDriver, tag: str, log, max_posts: int = 5) -> list[str]:
     """
@@ -43,16 +43,15 @@ def get_post_links(driver: WebDriver, tag: str, log, max_posts: int = 5) -> list
         time.sleep(2)
 
     # --- HTMLを解析して投稿リンク抽出 ---
-    log("🔍 投稿リンクを解析中（/p/ 形式を対象）")
-    soup = BeautifulSoup(driver.page_source, "html.parser")
+    log(f"🔍 投稿リンクを解析中（/p/ 形式を対象, parser={resolve_backend()}）")
     links = []
+    seen = set()
 
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
-        if href.startswith("/p/"):
-            full_link = f"https://www.instagram.com{href}"
-            if full_link not in links:
-                links.append(full_link)
+    for href in select_post_hrefs(driver.page_source):
+        full_link = f"https://www.instagram.com{href}"
+        if full_link not in seen:
+            seen.add(full_link)
+            links.append(full_link)
 
     log(f"✅ 全抽出リンク数: {len(links)} 件（上限 {max_posts} 件）")
 
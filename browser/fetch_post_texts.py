@@ -21,6 +21,9 @@ import time
 # 投稿本文のspan要素のclassに含まれるキーワード
 TARGET_CLASS_KEY = "x193iq5w"
 
+# 抽出対象とする投稿本文に含まれるべきリンク
+TARGET_LINK_KEY = "https://a.rakuten."
+
 def get_post_texts(driver: WebDriver, post_links: list[str], max_count: int = 5) -> list[dict]:
     """
     投稿本文を取得し、楽天リンクを含む投稿のみ返す
@@ -59,7 +62,7 @@ def get_post_texts(driver: WebDriver, post_links: list[str], max_count: int = 5)
             logging.debug(f"📝 結合後テキスト先頭: {post_text[:60]}...")
 
             # --- 楽天リンク含有チェック ---
-            if "https://a.rakuten." in post_text:
+            if TARGET_LINK_KEY in post_text:
                 logging.info("✅ 楽天リンクを含む投稿として抽出")
                 result.append({"url": link, "text": post_text})
             else:
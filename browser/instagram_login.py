@@ -16,7 +16,26 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 import time
 
-def login_and_get_driver(username: str, password: str, log) -> webdriver.Edge:
+def create_edge_driver(capture_network: bool = False) -> webdriver.Edge:
+    """
+    Edgeブラウザを起動してdriverを返す（ログインはしない）
+
+    Parameters:
+        capture_network (bool): True なら performance ログを有効にし、
+            通信内容を driver.get_log("performance") で読めるようにする
+
+    Returns:
+        webdriver.Edge: 起動済みのEdge WebDriver
+    """
+    options = Options()
+    options.add_argument("--start-maximized")
+    if capture_network:
+        options.set_capability("ms:loggingPrefs", {"performance": "ALL"})
+    return webdriver.Edge(options=options)
+
+
+def login_and_get_driver(username: str, password: str, log,
+                         capture_network: bool = False) -> webdriver.Edge:
     """
     Instagramにログインし、ログイン済みdriverを返す
 
@@ -24,6 +43,7 @@ def login_and_get_driver(username: str, password: str, log) -> webdriver.Edge:
         username (str): InstagramログインID
         password (str): Instagramパスワード
         log (function): ログ出力関数
+        capture_network (bool): True なら通信キャプチャ用の performance ログを有効にする
 
     Returns:
         webdriver.Edge: ログイン済みのEdge WebDriver
@@ -32,10 +52,8 @@ def login_and_get_driver(username: str, password: str, log) -> webdriver.Edge:
     log("🟡 login_and_get_driver() 開始")
 
     # --- ブラウザ起動設定 ---
-    options = Options()
-    options.add_argument("--start-maximized")
-    driver = webdriver.Edge(options=options)
-    log("🖥️ Edgeブラウザを起動しました")
+    driver = create_edge_driver(capture_network=capture_network)
+    log(f"🖥️ Edgeブラウザを起動しました（通信キャプチャ: {'有効' if capture_network else '無効'}）")
 
     # --- ログインページへアクセス ---
     login_url = "https://www.instagram.com/accounts/login/"
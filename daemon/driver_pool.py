@@ -0,0 +1,225 @@
+"""
+driver_pool.py
+ログイン済みWebDriverを常駐させて使い回すプール
+
+この構造は以下の責任を持つ：
+1. login_and_get_driver() で起動したログイン済みdriverを指定数だけ保持する
+2. ジョブごとにdriverを貸し出し、返却時にページ遷移数（driver.get 回数）を加算する
+3. 一定ページ数を超えた、またはブラウザのメモリ使用量が閾値を超えたdriverは
+   終了して新しいdriverに入れ替える（ブラウザのメモリリークを閉じ込める）
+
+メモリ使用量の計測には psutil を使う（未インストールならページ数のみで入れ替え判定）。
+"""
+
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class CountingDriver:
+    """
+    WebDriverのラッパー。get() の呼び出し回数を数え、それ以外はそのまま委譲する
+    """
+
+    def __init__(self, driver):
+        self._driver = driver
+        self.pages = 0
+
+    def get(self, url: str):
+        self.pages += 1
+        return self._driver.get(url)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+def browser_memory_mb(driver) -> float | None:
+    """
+    driver配下のブラウザプロセス群（msedgedriver＋子プロセス）のRSS合計をMBで返す
+
+    Returns:
+        float | None: psutil が無い、またはプロセスを特定できない場合は None
+    """
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        procs = [root, *root.children(recursive=True)]
+    except Exception:
+        return None
+
+    total = 0
+    for p in procs:
+        try:
+            total += p.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / (1024 * 1024)
+
+
+class DriverPool:
+    """
+    ログイン済みdriverのプール
+
+    Parameters:
+        username (str): InstagramログインID
+        password (str): Instagramパスワード
+        log (function): ログ出力関数
+        size (int): 常駐させるdriver数
+        max_pages (int): 1つのdriverで遷移できるページ数の上限（超えたら入れ替え）
+        max_memory_mb (float, optional): ブラウザのメモリ使用量の上限（MB）
+        login (function, optional): driver生成関数（既定: login_and_get_driver）
+    """
+
+    def __init__(self, username: str, password: str, log, size: int = 1,
+                 max_pages: int = 200, max_memory_mb: float | None = None, login=None):
+        if login is None:
+            from browser.instagram_login import login_and_get_driver
+            login = login_and_get_driver
+
+        self.username = username
+        self.password = password
+        self.log = log
+        self.size = size
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self._login = login
+
+        self._idle = queue.Queue()
+        self._alive = 0  # 起動済み（待機中＋貸出中）のdriver数
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {"created": 0, "recycled": 0, "jobs": 0}
+
+    # --- driverの生成・破棄 ---
+
+    def _create(self) -> CountingDriver:
+        self.log("🚀 プール用driverを起動・ログインします")
+        driver = CountingDriver(self._login(self.username, self.password, self.log))
+        with self._lock:
+            self._alive += 1
+            self.stats["created"] += 1
+        return driver
+
+    def _discard(self, driver: CountingDriver, reason: str) -> None:
+        self.log(f"♻️ driverを入れ替えます（{reason}, 遷移 {driver.pages} ページ）")
+        try:
+            driver.quit()
+        except Exception as e:
+            self.log(f"⚠️ driver終了時にエラー ▶ {type(e).__name__}: {e}")
+        with self._lock:
+            self._alive -= 1
+            self.stats["recycled"] += 1
+
+    def _recycle_reason(self, driver: CountingDriver) -> str | None:
+        """
+        入れ替えが必要なら理由を返す（不要なら None）
+        """
+        if driver.pages >= self.max_pages:
+            return f"ページ数上限 {self.max_pages} に到達"
+        if self.max_memory_mb is not None:
+            mem = browser_memory_mb(driver)
+            if mem is not None:
+                self.log(f"🧠 ブラウザメモリ使用量: {mem:.0f} MB（上限 {self.max_memory_mb:.0f} MB）")
+                if mem > self.max_memory_mb:
+                    return f"メモリ使用量 {mem:.0f} MB が上限超過"
+        return None
+
+    # --- 公開API ---
+
+    def start(self) -> None:
+        """
+        size 個のdriverを先に起動してプールを温めておく
+        """
+        self.log(f"🟡 DriverPool.start() 開始（size={self.size}, max_pages={self.max_pages}, "
+                 f"max_memory_mb={self.max_memory_mb}）")
+        if self.max_memory_mb is not None:
+            try:
+                import psutil  # noqa: F401
+            except ImportError:
+                self.log("⚠️ psutil 未インストールのためメモリ閾値は無効（ページ数のみで入れ替え）")
+        for _ in range(self.size):
+            self._idle.put(self._create())
+        self.log(f"✅ ログイン済みdriver {self.size} 個を待機させました")
+
+    def acquire(self, timeout: float | None = None) -> CountingDriver:
+        """
+        空いているdriverを借りる（空きが無ければ timeout 秒まで待つ）
+
+        補充に失敗してプールが size 未満に減っている場合は、ここで新しく起動する。
+        """
+        if self._closed:
+            raise RuntimeError("DriverPool は終了済みです")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            should_create = self._alive < self.size
+            if should_create:
+                self._alive += 1  # 起動中の枠を先に確保する
+        if should_create:
+            try:
+                driver = CountingDriver(self._login(self.username, self.password, self.log))
+            except Exception:
+                with self._lock:
+                    self._alive -= 1
+                raise
+            with self._lock:
+                self.stats["created"] += 1
+            return driver
+        return self._idle.get(timeout=timeout)
+
+    def release(self, driver: CountingDriver, broken: bool = False) -> None:
+        """
+        driverを返却する。入れ替え条件に当てはまれば新しいdriverを起動して補充する
+        """
+        with self._lock:
+            self.stats["jobs"] += 1
+
+        if self._closed:
+            self._discard(driver, "プール終了")
+            return
+
+        reason = "ジョブ中のエラー" if broken else self._recycle_reason(driver)
+        if reason:
+            self._discard(driver, reason)
+            try:
+                driver = self._create()
+            except Exception as e:
+                # 補充できなかった枠は次の acquire() で起動し直す
+                self.log(f"❌ 補充用driverの起動に失敗 ▶ {type(e).__name__}: {e}")
+                return
+        self._idle.put(driver)
+
+    @contextmanager
+    def driver(self, timeout: float | None = None):
+        """
+        with pool.driver() as d: の形でdriverを借りて自動返却する
+        """
+        d = self.acquire(timeout=timeout)
+        broken = False
+        try:
+            yield d
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.release(d, broken=broken)
+
+    def close(self) -> None:
+        """
+        待機中のdriverをすべて終了する
+        """
+        self._closed = True
+        while True:
+            try:
+                d = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(d, "プール終了")
+        self.log("🛑 DriverPool を終了しました")
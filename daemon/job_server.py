@@ -0,0 +1,285 @@
+"""
+job_server.py
+常駐クロールデーモンのローカルジョブAPI（HTTP）
+
+この構造は以下の責任を持つ：
+1. DriverPool の温まったdriverを使ってタグ巡回ジョブを実行する
+2. ローカルHTTP APIでジョブ（tag, max_posts）を受け付け、状態と結果を返す
+3. 結果は従来と同じ形（商品名 / 登場回数 / 商品ID）で csv/ に出力（export_csv）し、
+   JSON / CSV での取得時はそのCSVを読み込んで返す（DataFrameはメモリに残さない）
+4. 完了済みジョブは新しい順に max_jobs 件まで保持し、古いものから一覧から外す
+
+API：
+    POST /jobs            {"tag": "楽天room", "max_posts": 30, "titles": true, "wait": false}
+                          （tag / max_posts 省略時は daemon 起動時の --tag / --max-posts）
+                          → 202 {"id": ..., "status": "queued"}（wait=true なら完了まで待って結果を返す）
+    GET  /jobs            → 全ジョブの状態一覧
+    GET  /jobs/<id>       → ジョブの状態と結果（columns / rows / csv_path）
+    GET  /jobs/<id>/csv   → 結果CSV（export_csv と同じ utf-8-sig）
+    GET  /health          → プールの状態
+"""
+
+import itertools
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class CrawlJobRunner:
+    """
+    巡回ジョブの受付・実行・結果保持を行う
+
+    Parameters:
+        pool (DriverPool): ログイン済みdriverのプール
+        log (function): ログ出力関数
+        capture (bool): True ならフィード応答の通信キャプチャで巡回する
+        max_jobs (int): 保持する完了済みジョブ数の上限（超えた分は古い順に破棄）
+    """
+
+    def __init__(self, pool, log, capture: bool = False, max_jobs: int = 100):
+        self.pool = pool
+        self.log = log
+        self.capture = capture
+        self.max_jobs = max_jobs
+        self.jobs: dict[str, dict] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix="crawl-job")
+
+    def submit(self, tag: str, max_posts: int, titles: bool = True) -> dict:
+        """
+        ジョブを登録して実行キューに積む
+
+        HTTPスレッドが describe() で走査してもキー数が変わらないよう、
+        全キーを作成し future を設定してから self.jobs に公開する。
+        """
+        with self._lock:
+            job_id = str(next(self._ids))
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "tag": tag,
+            "max_posts": max_posts,
+            "titles": titles,
+            "submitted_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "finished_at": None,
+            "error": None,
+            "csv_path": None,
+            "future": None,
+        }
+        job["future"] = self._executor.submit(self._run, job)
+        with self._lock:
+            self.jobs[job_id] = job
+            self._prune()
+
+        self.log(f"📥 ジョブ受付 [{job_id}] tag={tag} max_posts={max_posts}")
+        return job
+
+    def _prune(self) -> None:
+        """
+        完了済みジョブが max_jobs 件を超えたら古い順に破棄する（self._lock 内で呼ぶ）
+        """
+        finished = [i for i, j in self.jobs.items() if j["finished_at"] is not None]
+        for job_id in finished[: max(len(finished) - self.max_jobs, 0)]:
+            del self.jobs[job_id]
+
+    def _run(self, job: dict) -> None:
+        """
+        1件のジョブを実行する（driverは巡回の間だけ借りる）
+        """
+        from aggregator.export_to_csv import export_csv
+        from pipeline import build_ranking, crawl_posts, extract_normalized_urls
+
+        job_log = lambda msg: self.log(f"[job {job['id']}] {msg}")
+        job["status"] = "running"
+
+        try:
+            with self.pool.driver() as driver:
+                post_texts = crawl_posts(driver, job["tag"], job["max_posts"], job_log, capture=self.capture)
+
+            all_urls = extract_normalized_urls(post_texts, job_log)
+            count_df = build_ranking(all_urls, job_log, with_titles=job["titles"])
+
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S") + f"_job{job['id']}"
+            export_csv(count_df, stamp, job_log)
+
+            job["csv_path"] = f"csv/商品ランキング_{stamp}.csv"
+            job["status"] = "done"
+        except Exception as e:
+            job_log(f"💥 ジョブ処理中にエラーが発生しました: {type(e).__name__} ▶ {e}")
+            job["error"] = f"{type(e).__name__}: {e}"
+            job["status"] = "failed"
+        finally:
+            job["finished_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def wait(self, job_id: str) -> dict:
+        """
+        ジョブ完了まで待つ
+        """
+        job = self.jobs[job_id]
+        job["future"].result()
+        return job
+
+    def _result_df(self, job: dict):
+        """
+        完了済みジョブの結果CSVを読み込む（未完了なら None）
+        """
+        import pandas as pd
+
+        if job["status"] != "done":
+            return None
+        return pd.read_csv(job["csv_path"], encoding="utf-8-sig")
+
+    def describe(self, job_id: str, with_result: bool = True) -> dict:
+        """
+        ジョブの状態（と結果）をJSON化可能なdictで返す
+        """
+        return self._describe(self.jobs[job_id], with_result)
+
+    def list_jobs(self) -> list[dict]:
+        """
+        全ジョブの状態一覧を返す（走査中に古いジョブが破棄されても崩れないよう複製してから読む）
+        """
+        with self._lock:
+            jobs = list(self.jobs.values())
+        return [self._describe(job, with_result=False) for job in jobs]
+
+    def _describe(self, job: dict, with_result: bool) -> dict:
+        info = {k: v for k, v in job.items() if k != "future"}
+        df = self._result_df(job) if with_result else None
+        if df is not None:
+            info["columns"] = list(df.columns)
+            # numpy型をJSON化するため pandas 経由で変換する
+            info["rows"] = json.loads(df.to_json(orient="records", force_ascii=False))
+        return info
+
+    def result_csv(self, job_id: str) -> bytes | None:
+        """
+        ジョブ結果をCSVバイト列で返す（未完了なら None）
+        """
+        job = self.jobs[job_id]
+        if job["status"] != "done":
+            return None
+        with open(job["csv_path"], "rb") as f:
+            return f.read()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _make_handler(runner: CrawlJobRunner, default_tag: str, default_max_posts: int):
+    """
+    runner を参照するリクエストハンドラクラスを生成する
+    """
+
+    class JobRequestHandler(BaseHTTPRequestHandler):
+
+        def _send_json(self, status: int, data) -> None:
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _job_id(self, path: str) -> str | None:
+            parts = path.strip("/").split("/")
+            if len(parts) >= 2 and parts[0] == "jobs" and parts[1] in runner.jobs:
+                return parts[1]
+            return None
+
+        def do_GET(self):
+            path = self.path.split("?")[0].rstrip("/")
+
+            if path == "/health":
+                pool = runner.pool
+                self._send_json(200, {"status": "ok", "pool_size": pool.size, **pool.stats})
+                return
+
+            if path == "/jobs":
+                self._send_json(200, runner.list_jobs())
+                return
+
+            job_id = self._job_id(path)
+            if job_id is None:
+                self._send_json(404, {"error": "not found"})
+                return
+
+            if path.endswith("/csv"):
+                body = runner.result_csv(job_id)
+                if body is None:
+                    self._send_json(409, {"error": "job not finished", "status": runner.jobs[job_id]["status"]})
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            self._send_json(200, runner.describe(job_id))
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/jobs":
+                self._send_json(404, {"error": "not found"})
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                tag = str(payload.get("tag") or default_tag).lstrip("#")
+                max_posts = int(payload.get("max_posts", default_max_posts))
+                titles = bool(payload.get("titles", True))
+            except (KeyError, ValueError, TypeError, AttributeError) as e:
+                self._send_json(400, {"error": f"invalid request: {type(e).__name__}: {e}"})
+                return
+
+            job = runner.submit(tag, max_posts, titles)
+            if payload.get("wait"):
+                runner.wait(job["id"])
+                self._send_json(200, runner.describe(job["id"]))
+            else:
+                self._send_json(202, runner.describe(job["id"], with_result=False))
+
+        def log_message(self, format, *args):
+            # アクセスログは標準エラーではなく共通log関数に流す
+            runner.log(f"🌐 {self.address_string()} {format % args}")
+
+    return JobRequestHandler
+
+
+def serve(pool, log, host: str = "127.0.0.1", port: int = 8765, default_tag: str = "楽天room",
+          default_max_posts: int = 5, capture: bool = False, max_jobs: int = 100) -> None:
+    """
+    プールを温めてからジョブAPIを起動し、Ctrl+C まで待ち受ける
+
+    Parameters:
+        pool (DriverPool): 未起動のdriverプール
+        log (function): ログ出力関数
+        host (str): 待ち受けアドレス（既定はローカルのみ）
+        port (int): 待ち受けポート
+        default_tag (str): tag 省略時の対象ハッシュタグ
+        default_max_posts (int): max_posts 省略時の取得件数
+        capture (bool): True ならフィード応答の通信キャプチャで巡回する
+                        （pool のdriverは capture_network=True で起動しておく）
+        max_jobs (int): 保持する完了済みジョブ数の上限
+    """
+    runner = server = None
+
+    try:
+        # プール起動中の失敗でも、起動済みのdriverは finally の pool.close() で終了する
+        pool.start()
+        runner = CrawlJobRunner(pool, log, capture=capture, max_jobs=max_jobs)
+        server = ThreadingHTTPServer((host, port), _make_handler(runner, default_tag, default_max_posts))
+        log(f"📡 ジョブAPIを起動しました: http://{host}:{port}/jobs")
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log("⏹️ 停止要求を受け付けました")
+    finally:
+        if server is not None:
+            server.server_close()
+        if runner is not None:
+            runner.shutdown()
+        pool.close()
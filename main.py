@@ -1,93 +1,340 @@
 """
 main.py
-Instagramアフィリエイト巡回の全体制御スクリプト（実行エントリーポイント）
+Instagramアフィリエイト巡回の全体制御スクリプト（実行エントリーポイント / CLI）
 
 このスクリプトは以下の責任を持つ：
-1. .envから設定を読み込み
-2. Instagramへログインし、指定タグの投稿を巡回
-3. 各投稿から楽天アフィリエイトURLを抽出・正規化
-4. URLの登場回数を集計し、商品名を取得
-5. 商品名 / 回数 / URL で構成されたCSVを出力
-6. 全処理のログをファイルに保存
-"""
+1. サブコマンドを解析し、必要な処理ステップだけを実行する
+2. 全処理のログをファイルに保存する
 
-from dotenv import load_dotenv
-from browser.instagram_login import login_and_get_driver
-from browser.fetch_post_links import get_post_links
-from browser.fetch_post_texts import get_post_texts
-from parser.extract_urls import extract_affiliate_urls
-from parser.normalize_urls import normalize_url
-from parser.fetch_titles import add_product_titles  # ✅ 商品名取得ステップ
-from aggregator.count_urls import count_normalized_urls
-from aggregator.export_to_csv import export_csv
-from util.logger import setup_logger
+サブコマンド：
+    run      ログイン → 巡回 → URL抽出 → 集計 → 商品名取得 → CSV出力（既定）
+    crawl    ログインしてタグを巡回し、投稿本文を json/ に保存
+    extract  保存済みの投稿本文から商品URLを抽出・正規化して json/ に保存
+    rank     正規化URLを集計してランキングCSVを出力（--top-k で固定メモリの近似集計）
+    titles   ランキングCSVに商品名列を追加して出力
+    export   既存のランキングCSVを csv/ に再出力
+    daemon   ログイン済みdriverを常駐させ、ローカルHTTP APIで巡回ジョブを受け付ける
+
+run / crawl / daemon に --capture を付けると、スクロール中のフィード応答（通信）から
+投稿本文を取得し、投稿ページへの遷移を応答に含まれなかった投稿だけに減らす。
+
+重い依存（selenium / pandas / requests / bs4）は各サブコマンド内で遅延importする。
+ブラウザを使わないサブコマンドは selenium を読み込まず、ログインも行わない。
+"""
 
+import argparse
 import os
 from datetime import datetime
 from pathlib import Path
 
-# --- 初期設定：環境変数・タイムスタンプ ---
-load_dotenv()
-USERNAME = os.getenv("INSTAGRAM_USER")
-PASSWORD = os.getenv("INSTAGRAM_PASS")
-TARGET_TAG = os.getenv("TARGET_TAG", "楽天room")
-MAX_POSTS = int(os.getenv("MAX_POSTS", 5))
-
-now = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-# --- ログディレクトリとロガー初期化 ---
-log_dir = Path("log")
-log_dir.mkdir(parents=True, exist_ok=True)
-log = setup_logger(log_dir / f"log_{now}.txt")
-log(f"📁 ログファイル作成")
-
-# --- Instagramログイン ---
-log("🚀 Instagramログイン処理を開始します")
-driver = login_and_get_driver(USERNAME, PASSWORD, log)
-
-try:
-    # --- タグページの投稿リンクを取得 ---
-    log("📌 タグ巡回を開始します")
-    post_links = get_post_links(driver, TARGET_TAG, log, max_posts=MAX_POSTS)
-
-    # --- 各投稿ページから本文を取得 ---
-    log("📌 各投稿の本文を取得します")
-    post_texts = get_post_texts(driver, post_links, max_count=MAX_POSTS)
-
-    # --- 本文から楽天アフィリエイトURLを抽出・正規化 ---
-    all_urls = []
-    for i, post in enumerate(post_texts):
-        log(f"🔎 [{i+1}/{len(post_texts)}] 投稿本文からリンク抽出中")
-
-        # ⭐ 本文の先頭だけ確認ログ（多すぎると煩雑なので80文字制限）
-        log(f"📝 本文抜粋: {post['text'][:80].replace('\n', ' ')}...")
-
-        urls = extract_affiliate_urls(post["text"])
-        normed = [normalize_url(u) for u in urls]
-        
-        if normed:
-            log(f"✅ 抽出されたリンク: {normed}")
+from util.logger import setup_logger
+
+# extract --sketch で新規作成するスケッチのカウンタ数
+DEFAULT_SKETCH_CAPACITY = 3000
+
+
+def _init_logger(now: str):
+    """
+    log/ ディレクトリを準備し、log関数を生成する
+    """
+    log_dir = Path("log")
+    log_dir.mkdir(parents=True, exist_ok=True)
+    log = setup_logger(log_dir / f"log_{now}.txt")
+    log(f"📁 ログファイル作成")
+    return log
+
+
+def _load_crawl_config(args) -> tuple[str, str, str, int]:
+    """
+    .env と引数からログイン情報・巡回設定を読み込む（引数が優先）
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    username = os.getenv("INSTAGRAM_USER")
+    password = os.getenv("INSTAGRAM_PASS")
+    tag = args.tag or os.getenv("TARGET_TAG", "楽天room")
+    max_posts = args.max_posts or int(os.getenv("MAX_POSTS", 5))
+    return username, password, tag, max_posts
+
+
+def _positive_int(value: str) -> int:
+    """
+    1以上の整数だけを受け付ける argparse の type
+    """
+    try:
+        n = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"整数を指定してください: {value}")
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"1以上を指定してください: {value}")
+    return n
+
+
+def _read_csv(path, log):
+    """
+    ランキングCSVを読み込む（export_csv と同じ utf-8-sig）
+    """
+    import pandas as pd
+
+    df = pd.read_csv(path, encoding="utf-8-sig")
+    log(f"📂 CSV読み込み完了: {path}（{len(df)} 行）")
+    return df
+
+
+def _write_csv(df, path, log) -> None:
+    """
+    -o で指定されたパスへDataFrameをCSV保存する
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(path, index=False, encoding="utf-8-sig")
+    log(f"✅ CSV出力完了: {path}")
+
+
+def cmd_run(args, now: str, log) -> None:
+    """
+    全処理を一括実行する（従来の main.py と同じ流れ）
+    """
+    from aggregator.export_to_csv import export_csv
+    from pipeline import build_ranking, extract_normalized_urls, iter_normalized_urls, run_crawl
+
+    username, password, tag, max_posts = _load_crawl_config(args)
+
+    try:
+        post_texts = run_crawl(username, password, tag, max_posts, log, capture=args.capture)
+
+        # --- 本文から楽天アフィリエイトURLを抽出・正規化 ---
+        # --top-k 指定時はURL一覧を作らず、1件ずつスケッチへ流す
+        if args.top_k is not None:
+            all_urls = iter_normalized_urls(post_texts, log)
         else:
-            log("ℹ️ 商品リンクは見つかりませんでした")
-        all_urls.extend(normed)
+            all_urls = extract_normalized_urls(post_texts, log)
+
+        # --- 集計 → 商品タイトル付与 ---
+        count_df = build_ranking(all_urls, log, top_k=args.top_k, capacity=args.capacity)
+
+        # --- CSVに保存（成果物出力）---
+        log("💾 結果をCSVとして保存します")
+        export_csv(count_df, now, log)
+
+    except Exception as e:
+        log(f"💥 処理中にエラーが発生しました: {e}")
 
-    # --- URLごとの登場回数を集計 ---
-    log("📊 商品リンクの出現回数を集計します")
-    count_df = count_normalized_urls(all_urls, log)
 
-    # --- 各URLから商品タイトルを取得して列追加 ---
-    log("📌 各URLから商品タイトルを取得します")
-    count_df = add_product_titles(count_df, log)
+def cmd_crawl(args, now: str, log) -> None:
+    """
+    巡回して投稿本文をJSONに保存する
+    """
+    from pipeline import run_crawl
+    from util.datafile import default_json_path, save_json
+
+    username, password, tag, max_posts = _load_crawl_config(args)
+    post_texts = run_crawl(username, password, tag, max_posts, log,
+                           capture=args.capture, record_dir=args.record_feed)
+    save_json(post_texts, args.output or default_json_path("posts", now), log)
+
+
+def cmd_extract(args, now: str, log) -> None:
+    """
+    投稿本文JSONから正規化URLを抽出してJSONに保存する
+
+    --sketch 指定時はURL一覧を保存せず、既存スケッチ（無ければ新規）に加算して保存する。
+    """
+    from pipeline import extract_normalized_urls, iter_normalized_urls
+    from util.datafile import default_json_path, load_json, save_json
+
+    post_texts = load_json(args.posts, log)
+
+    if args.sketch:
+        from aggregator.heavy_hitters import SpaceSaving
+
+        sketch_path = Path(args.sketch)
+        if sketch_path.exists():
+            sketch = SpaceSaving.load(sketch_path)
+            log(f"📂 既存スケッチを読み込み: {sketch_path}（N={sketch.n}, capacity={sketch.capacity}）")
+            # 既存スケッチの容量は変えられないため、食い違う指定は誤設定として止める
+            if args.capacity is not None and args.capacity != sketch.capacity:
+                log(f"❌ --capacity {args.capacity} が既存スケッチの capacity={sketch.capacity} と一致しません")
+                raise SystemExit(f"extract: --capacity {args.capacity} は既存スケッチ {sketch_path} の "
+                                 f"capacity={sketch.capacity} と異なります")
+        else:
+            sketch = SpaceSaving(args.capacity or DEFAULT_SKETCH_CAPACITY)
+            log(f"🆕 スケッチを新規作成: {sketch_path}（capacity={sketch.capacity}）")
+        sketch.update_many(iter_normalized_urls(post_texts, log))
+        sketch.save(sketch_path)
+        log(f"💾 スケッチ保存完了: {sketch_path}（N={sketch.n}, 保持 {len(sketch)} 件）")
+        return
 
-    # --- CSVに保存（成果物出力）---
-    log("💾 結果をCSVとして保存します")
+    all_urls = extract_normalized_urls(post_texts, log)
+    save_json(all_urls, args.output or default_json_path("urls", now), log)
+
+
+def cmd_rank(args, now: str, log) -> None:
+    """
+    正規化URLのJSON（またはスケッチ）を集計してランキングCSVを出力する（商品名なし）
+    """
+    from pipeline import build_ranking
+    from util.datafile import load_json
+
+    if args.urls and args.sketch:
+        raise SystemExit("rank: URL一覧と --sketch は同時に指定できません")
+    if args.sketch and args.capacity is not None:
+        raise SystemExit("rank: --sketch の容量は保存済みスケッチで決まるため --capacity は指定できません")
+
+    if args.sketch:
+        from aggregator.heavy_hitters import SpaceSaving, merge_sketches
+
+        # --- 複数ワーカーのスケッチをマージ ---
+        sketches = [SpaceSaving.load(p) for p in args.sketch]
+        capacities = {s.capacity for s in sketches}
+        if len(capacities) > 1:
+            log(f"⚠️ スケッチの capacity が揃っていません {sorted(capacities)} ▶ "
+                f"最小の {min(capacities)} に揃えてマージします（誤差上限が大きくなります）")
+        sketch = merge_sketches(sketches)
+        log(f"🔗 スケッチ {len(args.sketch)} 件をマージ（N={sketch.n}, 保持 {len(sketch)} 件）")
+        count_df = build_ranking(sketch, log, with_titles=False, top_k=args.top_k)
+    elif args.urls:
+        all_urls = load_json(args.urls, log)
+        count_df = build_ranking(all_urls, log, with_titles=False,
+                                 top_k=args.top_k, capacity=args.capacity)
+    else:
+        raise SystemExit("rank: URL一覧のJSONか --sketch を指定してください")
+
+    _write_csv(count_df, args.output or Path("csv") / f"商品集計_{now}.csv", log)
+
+
+def cmd_titles(args, now: str, log) -> None:
+    """
+    ランキングCSVの各商品IDから商品名を取得し直して出力する
+    """
+    from aggregator.export_to_csv import export_csv
+    from parser.fetch_titles import add_product_titles
+
+    count_df = _read_csv(args.ranking, log)
+    count_df = add_product_titles(count_df[["商品ID", "登場回数"]].copy(), log)
+
+    if args.output:
+        _write_csv(count_df, args.output, log)
+    else:
+        export_csv(count_df, now, log)
+
+
+def cmd_export(args, now: str, log) -> None:
+    """
+    既存のランキングCSVを csv/商品ランキング_{now}.csv として再出力する
+    """
+    from aggregator.export_to_csv import export_csv
+
+    count_df = _read_csv(args.ranking, log)
     export_csv(count_df, now, log)
 
-except Exception as e:
-    log(f"💥 処理中にエラーが発生しました: {e}")
 
-finally:
-    # --- ドライバ終了処理 ---
-    driver.quit()
-    log("🛑 ブラウザを終了しました")
-    log("🎉 全処理が完了しました")
+def cmd_daemon(args, now: str, log) -> None:
+    """
+    ログイン済みdriverのプールを温め、ジョブAPIで待ち受ける
+    """
+    from functools import partial
+
+    from browser.instagram_login import login_and_get_driver
+    from daemon.driver_pool import DriverPool
+    from daemon.job_server import serve
+
+    username, password, tag, max_posts = _load_crawl_config(args)
+    pool = DriverPool(
+        username, password, log,
+        size=args.pool_size,
+        max_pages=args.max_pages,
+        max_memory_mb=args.max_memory_mb,
+        login=partial(login_and_get_driver, capture_network=args.capture),
+    )
+    serve(pool, log, host=args.host, port=args.port, default_tag=tag,
+          default_max_posts=max_posts, capture=args.capture, max_jobs=args.max_jobs)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    """
+    サブコマンド付きの引数パーサを生成する
+    """
+    parser = argparse.ArgumentParser(
+        description="Instagramアフィリエイト巡回・集計ツール",
+    )
+    sub = parser.add_subparsers(dest="command")
+
+    def add_crawl_args(p):
+        p.add_argument("--tag", help="対象ハッシュタグ（既定: .env の TARGET_TAG）")
+        p.add_argument("--max-posts", type=int, help="取得件数の上限（既定: .env の MAX_POSTS）")
+        p.add_argument("--capture", action="store_true",
+                       help="スクロール中のフィード応答（通信）から本文を取得し、投稿ページ遷移を省く")
+
+    def add_top_k_args(p):
+        p.add_argument("--top-k", type=_positive_int, help="固定メモリの近似集計（Space-Saving）で上位K件だけ出力")
+        p.add_argument("--capacity", type=_positive_int, help="近似集計のカウンタ数（既定: top-k の10倍）")
+
+    p = sub.add_parser("run", help="巡回から商品名付きCSV出力までを一括実行（既定）")
+    add_crawl_args(p)
+    add_top_k_args(p)
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("crawl", help="タグを巡回して投稿本文をJSONに保存")
+    add_crawl_args(p)
+    p.add_argument("-o", "--output", help="出力JSON（既定: json/posts_{日時}.json）")
+    p.add_argument("--record-feed", help="--capture で受信したフィード応答を保存するディレクトリ（再生テスト用）")
+    p.set_defaults(func=cmd_crawl)
+
+    p = sub.add_parser("extract", help="投稿本文JSONから正規化URLを抽出")
+    p.add_argument("posts", help="crawl が出力した投稿本文JSON")
+    p.add_argument("-o", "--output", help="出力JSON（既定: json/urls_{日時}.json）")
+    p.add_argument("--sketch", help="URL一覧の代わりに近似集計スケッチ（JSON）へ加算して保存")
+    p.add_argument("--capacity", type=_positive_int,
+                   help=f"スケッチ新規作成時のカウンタ数（既定: {DEFAULT_SKETCH_CAPACITY}、既存スケッチと異なる値はエラー）")
+    p.set_defaults(func=cmd_extract)
+
+    p = sub.add_parser("rank", help="正規化URLを集計してランキングCSVを出力")
+    p.add_argument("urls", nargs="?", help="extract が出力した正規化URLのJSON")
+    p.add_argument("--sketch", nargs="+", help="extract --sketch のスケッチ（複数指定でマージ）")
+    add_top_k_args(p)
+    p.add_argument("-o", "--output", help="出力CSV（既定: csv/商品集計_{日時}.csv）")
+    p.set_defaults(func=cmd_rank)
+
+    p = sub.add_parser("titles", help="ランキングCSVに商品名を付与")
+    p.add_argument("ranking", help="商品ID / 登場回数 を含むCSV")
+    p.add_argument("-o", "--output", help="出力CSV（既定: csv/商品ランキング_{日時}.csv）")
+    p.set_defaults(func=cmd_titles)
+
+    p = sub.add_parser("export", help="ランキングCSVを csv/ に再出力")
+    p.add_argument("ranking", help="出力済みのランキングCSV")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("daemon", help="常駐してローカルHTTP APIで巡回ジョブを受け付け")
+    add_crawl_args(p)
+    p.add_argument("--host", default="127.0.0.1", help="待ち受けアドレス（既定: 127.0.0.1）")
+    p.add_argument("--port", type=int, default=8765, help="待ち受けポート（既定: 8765）")
+    p.add_argument("--pool-size", type=int, default=1, help="常駐させるdriver数（既定: 1）")
+    p.add_argument("--max-pages", type=int, default=200, help="driverを入れ替えるページ遷移数（既定: 200）")
+    p.add_argument("--max-memory-mb", type=float, help="driverを入れ替えるブラウザメモリ使用量MB（psutil が必要）")
+    p.add_argument("--max-jobs", type=int, default=100, help="保持する完了済みジョブ数（既定: 100、結果CSVは csv/ に残る）")
+    p.set_defaults(func=cmd_daemon)
+
+    return parser
+
+
+def main(argv=None) -> None:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+
+    # --- サブコマンド省略時は従来どおり一括実行 ---
+    if args.command is None:
+        args = parser.parse_args(["run"])
+
+    now = datetime.now().strftime("%Y%m%d_%H%M%S")
+    log = _init_logger(now)
+
+    try:
+        args.func(args, now, log)
+    finally:
+        log("🎉 全処理が完了しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+feed_payload.py
+
+タグページがスクロール時に受信するJSON（フィード応答）から投稿情報を取り出すモジュール
+
+この構造は以下の責任を持つ：
+1. 応答本文を先頭から順にJSON文書として読み進める
+   （"for (;;);" などの接頭辞や、改行区切りで複数文書が連結された応答にも対応）
+2. 文書内を走査し、投稿ノードから shortcode と本文（caption）を取り出す
+   - GraphQL形式: {"shortcode": ..., "edge_media_to_caption": {"edges": [{"node": {"text": ...}}]}}
+   - v1 API形式:  {"code": ..., "caption": {"text": ...}}
+3. 文書を1つ読むごとに結果を yield し、応答全体の投稿リストを作らない
+"""
+
+import json
+
+# 応答本文の先頭に付くことがあるJSONハイジャック対策の接頭辞
+_PREFIXES = ("for (;;);", "while(1);", ")]}'")
+
+_decoder = json.JSONDecoder()
+
+
+def iter_json_documents(payload):
+    """
+    応答本文に含まれるJSON文書を先頭から1つずつ返す
+
+    Parameters:
+        payload (str | bytes): 応答本文
+
+    Yields:
+        dict | list: デコード済みのJSON文書
+    """
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8", errors="replace")
+
+    pos, end = 0, len(payload)
+    while pos < end:
+        # --- 空白・接頭辞を読み飛ばす ---
+        while pos < end and payload[pos].isspace():
+            pos += 1
+        for prefix in _PREFIXES:
+            if payload.startswith(prefix, pos):
+                pos += len(prefix)
+                break
+        if pos >= end:
+            return
+        if payload[pos] not in "{[":
+            return  # JSON以外（HTMLなど）は対象外
+
+        try:
+            doc, pos = _decoder.raw_decode(payload, pos)
+        except json.JSONDecodeError:
+            return
+        yield doc
+
+
+def _caption_of(node: dict) -> str | None:
+    """
+    投稿ノードから本文を取り出す（本文なしは None）
+    """
+    # --- v1 API形式 ---
+    caption = node.get("caption")
+    if isinstance(caption, dict):
+        return caption.get("text")
+    if isinstance(caption, str):
+        return caption
+
+    # --- GraphQL形式 ---
+    edges = (node.get("edge_media_to_caption") or {}).get("edges") or []
+    if edges:
+        return (edges[0].get("node") or {}).get("text")
+    return None
+
+
+def _is_post_node(node: dict) -> str | None:
+    """
+    投稿ノードなら shortcode を返す
+    """
+    if isinstance(node.get("shortcode"), str):
+        return node["shortcode"]
+    # v1 API の "code" はメディア以外にも使われるため、投稿らしいキーの併記を条件にする
+    if isinstance(node.get("code"), str) and ("caption" in node or "media_type" in node):
+        return node["code"]
+    return None
+
+
+def iter_feed_posts(payload):
+    """
+    応答本文に含まれる投稿を {'shortcode', 'caption'} として順に返す
+
+    Parameters:
+        payload (str | bytes): フィード応答の本文
+
+    Yields:
+        dict: {'shortcode': 投稿ID, 'caption': 本文（無ければ None）}
+    """
+    for doc in iter_json_documents(payload):
+        # --- 再帰せずスタックで走査（深いJSONでも安全） ---
+        stack = [doc]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                shortcode = _is_post_node(node)
+                if shortcode:
+                    yield {"shortcode": shortcode, "caption": _caption_of(node)}
+                    continue  # 投稿の中（カルーセル子要素など）は走査しない
+                stack.extend(reversed(list(node.values())))
+            elif isinstance(node, list):
+                stack.extend(reversed(node))
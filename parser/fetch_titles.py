@@ -1,7 +1,7 @@
 import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import time
+from parser.html_backend import select_og_title, select_title
 
 def fetch_title_from_url(url: str, log=None) -> str:
     """
@@ -30,13 +30,10 @@ def fetch_title_from_url(url: str, log=None) -> str:
                 log(f"🧾 HTML抜粋: {snippet} ...")
             return "タイトル取得失敗"
 
-        # --- HTMLパース ---
-        soup = BeautifulSoup(res.text, "html.parser")
-
-        # --- og:title 抽出 ---
-        og_tag = soup.find("meta", property="og:title")
-        if og_tag:
-            og_title = og_tag.get("content", "").strip()
+        # --- og:title 抽出（<head> 内のみ解析） ---
+        og_title = select_og_title(res.text)
+        if og_title is not None:
+            og_title = og_title.strip()
             if og_title:
                 if log:
                     log(f"✅ og:title 抽出成功 ▶ {og_title}")
@@ -46,19 +43,16 @@ def fetch_title_from_url(url: str, log=None) -> str:
                     log("⚠️ og:titleタグは存在するが中身が空")
 
         # --- fallback: titleタグ ---
-        if soup.title:
-            if soup.title.string:
-                title_text = soup.title.string.strip()
-                if title_text:
-                    if log:
-                        log(f"✅ <title> タグから抽出 ▶ {title_text}")
-                    return title_text
-                else:
-                    if log:
-                        log("⚠️ <title> タグが空")
+        title_text = select_title(res.text)
+        if title_text is not None:
+            title_text = title_text.strip()
+            if title_text:
+                if log:
+                    log(f"✅ <title> タグから抽出 ▶ {title_text}")
+                return title_text
             else:
                 if log:
-                    log("⚠️ <title> タグに文字列が存在しない")
+                    log("⚠️ <title> タグが空")
         else:
             if log:
                 log("⚠️ <title> タグ自体が存在しない")
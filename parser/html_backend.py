@@ -0,0 +1,244 @@
+"""
+html_backend.py
+HTML解析バックエンドの切り替えモジュール（投稿リンク・商品タイトル抽出用）
+
+このモジュールは以下の責任を持つ：
+1. 利用可能な高速パーサ（selectolax → lxml）を自動選択し、無ければ BeautifulSoup を使う
+2. 必要な要素だけを取り出す目的別クエリを提供する
+   - a[href^="/p/"] の href 一覧（タグページの投稿リンク）
+   - meta[property="og:title"] の content（商品ページ）
+   - title のテキスト（商品ページ）
+3. og:title / title は </head> までに絞って解析し、巨大な本文の木構造を作らない
+
+バックエンドは引数または環境変数 HTML_BACKEND（auto / selectolax / lxml / bs4）で指定できる。
+"""
+
+import logging
+import os
+import re
+from functools import lru_cache
+
+# 自動選択時の優先順（先頭ほど高速）
+BACKENDS = ("selectolax", "lxml", "bs4")
+
+POST_HREF_PREFIX = "/p/"
+
+_HEAD_END = re.compile(r"</head\s*>", re.IGNORECASE)
+
+
+def _is_available(name: str) -> bool:
+    """
+    バックエンドのライブラリがimport可能か判定する
+    """
+    try:
+        if name == "selectolax":
+            import selectolax.lexbor  # noqa: F401
+        elif name == "lxml":
+            import lxml.html  # noqa: F401
+        else:
+            import bs4  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def resolve_backend(name: str | None = None) -> str:
+    """
+    使用するバックエンド名を決定する
+
+    Parameters:
+        name (str, optional): auto / selectolax / lxml / bs4（省略時は環境変数 HTML_BACKEND）
+
+    Returns:
+        str: 実際に使うバックエンド名
+    """
+    name = (name or os.getenv("HTML_BACKEND", "auto")).lower()
+
+    if name == "auto":
+        for candidate in BACKENDS:
+            if _is_available(candidate):
+                return candidate
+        raise ImportError("HTML解析ライブラリ（selectolax / lxml / beautifulsoup4）が見つかりません")
+
+    if name not in BACKENDS:
+        raise ValueError(f"未対応のHTMLバックエンド: {name}（{' / '.join(BACKENDS)} から指定）")
+    if not _is_available(name):
+        raise ImportError(f"HTMLバックエンド '{name}' のライブラリがインストールされていません")
+    return name
+
+
+def _head_part(html: str) -> str:
+    """
+    </head> までを切り出す（見つからなければ全体を返す）
+    """
+    m = _HEAD_END.search(html)
+    return html[: m.end()] if m else html
+
+
+# ---------------------------------------------------------------------------
+# バックエンド別の実装
+# ---------------------------------------------------------------------------
+
+def _post_hrefs_selectolax(html: str) -> list[str]:
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    return [node.attributes.get("href") for node in tree.css(f'a[href^="{POST_HREF_PREFIX}"]')]
+
+
+def _lxml_root(html: str):
+    """
+    lxml で解析する。str のままだと <?xml encoding=...?> 付きXHTMLで ValueError になるため
+    UTF-8 のバイト列とエンコーディング指定付きパーサで渡す
+    """
+    import lxml.html
+
+    parser = lxml.html.HTMLParser(encoding="utf-8")
+    return lxml.html.fromstring(html.encode("utf-8"), parser=parser)
+
+
+def _post_hrefs_lxml(html: str) -> list[str]:
+    if not html.strip():
+        return []
+    root = _lxml_root(html)
+    return [str(h) for h in root.xpath(f'//a[starts-with(@href, "{POST_HREF_PREFIX}")]/@href')]
+
+
+def _post_hrefs_bs4(html: str) -> list[str]:
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    only = SoupStrainer("a", href=lambda h: h is not None and h.startswith(POST_HREF_PREFIX))
+    soup = BeautifulSoup(html, "html.parser", parse_only=only)
+    return [a["href"] for a in soup.find_all("a")]
+
+
+def _og_title_selectolax(html: str) -> str | None:
+    from selectolax.lexbor import LexborHTMLParser
+
+    node = LexborHTMLParser(html).css_first('meta[property="og:title"]')
+    if node is None:
+        return None
+    return node.attributes.get("content") or ""
+
+
+def _og_title_lxml(html: str) -> str | None:
+    if not html.strip():
+        return None
+    found = _lxml_root(html).xpath('//meta[@property="og:title"]')
+    if not found:
+        return None
+    return found[0].get("content") or ""
+
+
+def _og_title_bs4(html: str) -> str | None:
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("meta", property="og:title"))
+    tag = soup.find("meta")
+    if tag is None:
+        return None
+    return tag.get("content") or ""
+
+
+def _title_selectolax(html: str) -> str | None:
+    from selectolax.lexbor import LexborHTMLParser
+
+    node = LexborHTMLParser(html).css_first("title")
+    return None if node is None else node.text()
+
+
+def _title_lxml(html: str) -> str | None:
+    if not html.strip():
+        return None
+    found = _lxml_root(html).xpath("//title")
+    return found[0].text_content() if found else None
+
+
+def _title_bs4(html: str) -> str | None:
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    tag = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("title")).find("title")
+    return None if tag is None else tag.get_text()
+
+
+_POST_HREFS = {"selectolax": _post_hrefs_selectolax, "lxml": _post_hrefs_lxml, "bs4": _post_hrefs_bs4}
+_OG_TITLE = {"selectolax": _og_title_selectolax, "lxml": _og_title_lxml, "bs4": _og_title_bs4}
+_TITLE = {"selectolax": _title_selectolax, "lxml": _title_lxml, "bs4": _title_bs4}
+
+
+@lru_cache(maxsize=None)
+def _parser_errors() -> tuple:
+    """
+    BeautifulSoup で検索し直す対象の解析エラー
+    （lxml はコメントだけの文書で ParserError、エンコーディング宣言付きの str で ValueError を送出する）
+    """
+    errors = [ValueError]
+    if _is_available("lxml"):
+        from lxml.etree import ParserError
+
+        errors.append(ParserError)
+    return tuple(errors)
+
+
+def _query(queries: dict, html: str, backend: str | None):
+    """
+    指定バックエンドで検索し、解析エラーのときだけ BeautifulSoup で検索し直す
+    """
+    name = resolve_backend(backend)
+    try:
+        return queries[name](html)
+    except _parser_errors() as e:
+        if name == "bs4" or not _is_available("bs4"):
+            raise
+        logging.warning(f"⚠️ {name} で解析できないため BeautifulSoup で再解析します: {type(e).__name__} ▶ {e}")
+        return queries["bs4"](html)
+
+
+# ---------------------------------------------------------------------------
+# 目的別クエリ（公開API）
+# ---------------------------------------------------------------------------
+
+def select_post_hrefs(html: str, backend: str | None = None) -> list[str]:
+    """
+    a[href^="/p/"] の href を文書順に返す（重複除去は呼び出し側で行う）
+
+    Parameters:
+        html (str): タグページのHTML（driver.page_source）
+        backend (str, optional): 使用するバックエンド
+
+    Returns:
+        list[str]: "/p/〜" 形式の相対リンク
+    """
+    return _query(_POST_HREFS, html, backend)
+
+
+def _select_in_head(queries: dict, html: str, backend: str | None) -> str | None:
+    """
+    </head> までを先に検索し、見つからなければ文書全体を検索する
+    """
+    head = _head_part(html)
+    found = _query(queries, head, backend)
+    if found is None and len(head) < len(html):
+        found = _query(queries, html, backend)
+    return found
+
+
+def select_og_title(html: str, backend: str | None = None) -> str | None:
+    """
+    meta[property="og:title"] の content を返す
+
+    Returns:
+        str | None: タグが無ければ None、content が空なら ""
+    """
+    return _select_in_head(_OG_TITLE, html, backend)
+
+
+def select_title(html: str, backend: str | None = None) -> str | None:
+    """
+    <title> のテキストを返す
+
+    Returns:
+        str | None: タグが無ければ None、中身が空なら ""
+    """
+    return _select_in_head(_TITLE, html, backend)
@@ -0,0 +1,167 @@
+"""
+pipeline.py
+巡回からCSV出力までの処理ステップをまとめたモジュール
+
+このモジュールは以下の責任を持つ：
+1. ログイン〜投稿本文取得（crawl）を1関数にまとめる
+2. 投稿本文から楽天/Amazon/YahooのURLを抽出・正規化する
+3. URL集計 → 商品名付与までのランキング生成を行う
+
+selenium / pandas / requests / bs4 などの重い依存は各関数の中で遅延importする。
+main.py のサブコマンドは必要なステップだけを呼び出すため、
+ブラウザを使わないコマンドでは selenium を読み込まない。
+"""
+
+
+def crawl_posts(driver, tag: str, max_posts: int, log,
+                capture: bool = False, record_dir=None) -> list[dict]:
+    """
+    ログイン済みdriverでタグページを巡回し、投稿本文を取得する
+
+    Parameters:
+        driver (WebDriver): ログイン済みのWebDriver
+        tag (str): 対象ハッシュタグ
+        max_posts (int): 取得件数の上限
+        log (function): ログ出力関数
+        capture (bool): True ならフィード応答の通信キャプチャで本文を取得し、
+            取得できなかった投稿だけ投稿ページを開く（driverは capture_network=True で起動）
+        record_dir (str or Path, optional): 通信キャプチャした応答本文の保存先
+
+    Returns:
+        list[dict]: [{'url': 投稿URL, 'text': 本文テキスト}]
+    """
+    from browser.fetch_post_texts import TARGET_LINK_KEY, get_post_texts
+
+    if capture:
+        from browser.capture_feed import capture_tag_posts
+
+        # --- スクロール中のフィード応答から投稿IDと本文を取得 ---
+        log("📌 タグ巡回を開始します（通信キャプチャ）")
+        posts = capture_tag_posts(driver, tag, log, max_posts=max_posts, record_dir=record_dir)
+
+        result = [p for p in posts if p["text"] and TARGET_LINK_KEY in p["text"]]
+        missing = [p["url"] for p in posts if p["text"] is None]
+        log(f"✅ 応答本文から楽天リンク付き投稿 {len(result)} 件を取得")
+
+        # --- 応答に含まれなかった投稿だけ従来どおり投稿ページから取得 ---
+        if missing:
+            log(f"📌 本文未取得の投稿 {len(missing)} 件を投稿ページから取得します")
+            result.extend(get_post_texts(driver, missing, max_count=len(missing)))
+        return result
+
+    from browser.fetch_post_links import get_post_links
+
+    # --- タグページの投稿リンクを取得 ---
+    log("📌 タグ巡回を開始します")
+    post_links = get_post_links(driver, tag, log, max_posts=max_posts)
+
+    # --- 各投稿ページから本文を取得 ---
+    log("📌 各投稿の本文を取得します")
+    return get_post_texts(driver, post_links, max_count=max_posts)
+
+
+def run_crawl(username: str, password: str, tag: str, max_posts: int, log,
+              capture: bool = False, record_dir=None) -> list[dict]:
+    """
+    Instagramへログインして巡回し、終了時にブラウザを閉じる
+
+    Returns:
+        list[dict]: [{'url': 投稿URL, 'text': 本文テキスト}]
+    """
+    from browser.instagram_login import login_and_get_driver
+
+    # --- Instagramログイン ---
+    log("🚀 Instagramログイン処理を開始します")
+    driver = login_and_get_driver(username, password, log, capture_network=capture)
+
+    try:
+        return crawl_posts(driver, tag, max_posts, log, capture=capture, record_dir=record_dir)
+    finally:
+        # --- ドライバ終了処理 ---
+        driver.quit()
+        log("🛑 ブラウザを終了しました")
+
+
+def iter_normalized_urls(post_texts, log):
+    """
+    投稿本文から楽天アフィリエイトURLを抽出・正規化し、1件ずつ返す
+
+    Parameters:
+        post_texts (Iterable[dict]): {'url': 投稿URL, 'text': 本文テキスト} の列
+        log (function): ログ出力関数
+
+    Yields:
+        str: 正規化済みの商品ID（重複あり）
+    """
+    from parser.extract_urls import extract_affiliate_urls
+    from parser.normalize_urls import normalize_url
+
+    for i, post in enumerate(post_texts):
+        log(f"🔎 [{i+1}] 投稿本文からリンク抽出中")
+
+        # ⭐ 本文の先頭だけ確認ログ（多すぎると煩雑なので80文字制限）
+        excerpt = post["text"][:80].replace("\n", " ")
+        log(f"📝 本文抜粋: {excerpt}...")
+
+        urls = extract_affiliate_urls(post["text"])
+        normed = [normalize_url(u) for u in urls]
+
+        if normed:
+            log(f"✅ 抽出されたリンク: {normed}")
+        else:
+            log("ℹ️ 商品リンクは見つかりませんでした")
+        yield from normed
+
+
+def extract_normalized_urls(post_texts: list[dict], log) -> list[str]:
+    """
+    投稿本文から楽天アフィリエイトURLを抽出・正規化する
+
+    Parameters:
+        post_texts (list[dict]): [{'url': 投稿URL, 'text': 本文テキスト}]
+        log (function): ログ出力関数
+
+    Returns:
+        list[str]: 正規化済みの商品ID（重複あり）
+    """
+    log(f"📌 投稿 {len(post_texts)} 件からリンクを抽出します")
+    return list(iter_normalized_urls(post_texts, log))
+
+
+def build_ranking(all_urls, log, with_titles: bool = True,
+                  top_k: int | None = None, capacity: int | None = None):
+    """
+    正規化済みURLを集計し、必要なら商品タイトル列を追加する
+
+    Parameters:
+        all_urls (Iterable[str] | SpaceSaving): 正規化済みの商品ID、または集計済みスケッチ
+        log (function): ログ出力関数
+        with_titles (bool): True なら商品ページから商品名を取得する
+        top_k (int, optional): 指定すると固定メモリの近似集計（Space-Saving）で上位 top_k 件だけ返す
+        capacity (int, optional): 近似集計のカウンタ数（既定: top_k の10倍）
+
+    Returns:
+        pd.DataFrame: 商品ID / 登場回数（with_titles=True なら商品名 / 登場回数 / 商品ID）
+    """
+    from aggregator.heavy_hitters import SpaceSaving, rank_top_k
+
+    # --- URLごとの登場回数を集計 ---
+    log("📊 商品リンクの出現回数を集計します")
+    if isinstance(all_urls, SpaceSaving):
+        count_df = rank_top_k(all_urls, top_k if top_k is not None else all_urls.capacity, log)
+    elif top_k is not None:
+        sketch = SpaceSaving(capacity if capacity is not None else top_k * 10).update_many(all_urls)
+        count_df = rank_top_k(sketch, top_k, log)
+    else:
+        from aggregator.count_urls import count_normalized_urls
+
+        count_df = count_normalized_urls(list(all_urls), log)
+
+    if with_titles:
+        from parser.fetch_titles import add_product_titles
+
+        # --- 各URLから商品タイトルを取得して列追加 ---
+        log("📌 各URLから商品タイトルを取得します")
+        count_df = add_product_titles(count_df, log)
+
+    return count_df
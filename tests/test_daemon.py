@@ -0,0 +1,178 @@
+"""
+test_daemon.py
+
+DriverPool（ページ数の計測・入れ替え・補充失敗からの復帰）と
+CrawlJobRunner（ジョブ受付・状態・結果CSV・完了済みジョブの保持上限）を
+ブラウザを起動しない偽driverで確認するテスト
+"""
+
+import codecs
+
+import pytest
+
+import pipeline
+from daemon.driver_pool import CountingDriver, DriverPool
+from daemon.job_server import CrawlJobRunner
+
+
+class FakeDriver:
+    def __init__(self):
+        self.visited = []
+        self.quitted = False
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def quit(self):
+        self.quitted = True
+
+
+def make_pool(size=1, max_pages=200, login=None):
+    return DriverPool("user", "pass", lambda msg: None, size=size, max_pages=max_pages,
+                      login=login or (lambda u, p, log: FakeDriver()))
+
+
+def test_counting_driver_counts_get_and_delegates():
+    inner = FakeDriver()
+    d = CountingDriver(inner)
+    d.get("https://example.com/1")
+    d.get("https://example.com/2")
+    assert d.pages == 2
+    assert inner.visited == ["https://example.com/1", "https://example.com/2"]
+    d.quit()
+    assert inner.quitted
+
+
+def test_pool_recycles_driver_at_max_pages():
+    pool = make_pool(max_pages=2)
+    pool.start()
+
+    with pool.driver() as d:
+        d.get("a")
+    with pool.driver() as d2:
+        assert d2 is d
+        d2.get("b")
+
+    with pool.driver() as d3:
+        assert d3 is not d
+        assert d3.pages == 0
+    assert d._driver.quitted
+    assert pool.stats == {"created": 2, "recycled": 1, "jobs": 3}
+    pool.close()
+
+
+def test_pool_discards_driver_when_job_fails():
+    pool = make_pool()
+    pool.start()
+
+    with pytest.raises(RuntimeError):
+        with pool.driver() as d:
+            raise RuntimeError("boom")
+
+    assert d._driver.quitted
+    with pool.driver() as d2:
+        assert d2 is not d
+    assert pool.stats["recycled"] == 1
+    pool.close()
+
+
+def test_pool_recreates_failed_refill_on_acquire():
+    calls = {"n": 0}
+
+    def flaky_login(u, p, log):
+        calls["n"] += 1
+        if calls["n"] == 2:
+            raise ConnectionError("login failed")
+        return FakeDriver()
+
+    pool = make_pool(login=flaky_login)
+    pool.start()
+
+    # ジョブ失敗 → 補充（2回目のログイン）が失敗しても例外はジョブ側の1つだけ
+    with pytest.raises(RuntimeError):
+        with pool.driver():
+            raise RuntimeError("boom")
+    assert pool._alive == 0
+
+    # 次の acquire() で枠を起動し直す
+    d = pool.acquire(timeout=1)
+    assert isinstance(d, CountingDriver)
+    assert pool._alive == 1
+    assert calls["n"] == 3
+    pool.release(d)
+    pool.close()
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pool = make_pool()
+    pool.start()
+    r = CrawlJobRunner(pool, lambda msg: None)
+    yield r
+    r.shutdown()
+    pool.close()
+
+
+def test_job_done_describe_and_csv(runner, monkeypatch):
+    posts = [
+        {"url": "https://www.instagram.com/p/A/", "text": "おすすめ https://item.rakuten.co.jp/shop/item-a/"},
+        {"url": "https://www.instagram.com/p/B/", "text": "再掲 https://item.rakuten.co.jp/shop/item-a/"},
+    ]
+    seen = {}
+
+    def fake_crawl_posts(driver, tag, max_posts, log, capture=False, record_dir=None):
+        seen.update(tag=tag, max_posts=max_posts, capture=capture)
+        return posts
+
+    monkeypatch.setattr(pipeline, "crawl_posts", fake_crawl_posts)
+
+    job = runner.submit("楽天room", 2, titles=False)
+    runner.wait(job["id"])
+
+    assert seen == {"tag": "楽天room", "max_posts": 2, "capture": False}
+    info = runner.describe(job["id"])
+    assert info["status"] == "done"
+    assert info["error"] is None
+    assert "future" not in info
+    assert info["columns"] == ["商品ID", "登場回数"]
+    assert [row["登場回数"] for row in info["rows"]] == [2]
+
+    body = runner.result_csv(job["id"])
+    assert body.startswith(codecs.BOM_UTF8)
+    with open(job["csv_path"], "rb") as f:
+        assert f.read() == body
+
+
+def test_job_failed_describe_and_csv(runner, monkeypatch):
+    def broken_crawl_posts(*args, **kwargs):
+        raise RuntimeError("tag page not loaded")
+
+    monkeypatch.setattr(pipeline, "crawl_posts", broken_crawl_posts)
+
+    job = runner.submit("楽天room", 2, titles=False)
+    runner.wait(job["id"])
+
+    info = runner.describe(job["id"])
+    assert info["status"] == "failed"
+    assert info["error"] == "RuntimeError: tag page not loaded"
+    assert info["finished_at"] is not None
+    assert "rows" not in info
+    assert runner.result_csv(job["id"]) is None
+    # ジョブ中のエラーで使ったdriverは入れ替えられる
+    assert runner.pool.stats["recycled"] == 1
+
+
+def test_finished_jobs_are_pruned_to_max_jobs(runner, monkeypatch):
+    monkeypatch.setattr(pipeline, "crawl_posts", lambda *args, **kwargs: [])
+    runner.max_jobs = 2
+
+    ids = []
+    for _ in range(4):
+        job = runner.submit("楽天room", 1, titles=False)
+        runner.wait(job["id"])
+        ids.append(job["id"])
+
+    # 4件目の受付時点で完了済みは3件 → 最古の1件だけ破棄される
+    assert list(runner.jobs) == ids[1:]
+    assert [j["id"] for j in runner.list_jobs()] == ids[1:]
@@ -0,0 +1,170 @@
+"""
+test_feed_capture.py
+
+通信キャプチャ（フィード応答の解析・performance ログの読み取り・再生サーバ・
+crawl_posts(capture=True) の投稿ページ確認の絞り込み）をブラウザなしで確認するテスト
+"""
+
+import json
+import sys
+import threading
+import types
+import urllib.request
+
+import pipeline
+from browser import feed_replay_server
+from browser.capture_feed import FeedCapture, _is_feed_response
+from parser.feed_payload import iter_feed_posts
+
+V1_PAYLOAD = {
+    "sections": [
+        {"layout_content": {"medias": [
+            {"media": {"code": "V1A", "media_type": 1, "caption": {"text": "本文A https://a.rakuten.co.jp/x"}}},
+            {"media": {"code": "V1B", "media_type": 1, "caption": None}},
+        ]}},
+    ],
+}
+
+GRAPHQL_PAYLOAD = {
+    "data": {"hashtag": {"edge_hashtag_to_media": {"edges": [
+        {"node": {"shortcode": "GQA", "edge_media_to_caption": {"edges": [{"node": {"text": "本文GQ"}}]}}},
+        {"node": {"shortcode": "GQB", "edge_media_to_caption": {"edges": []}}},
+    ]}}},
+}
+
+
+def test_iter_feed_posts_v1_shape():
+    posts = list(iter_feed_posts(json.dumps(V1_PAYLOAD)))
+    assert posts == [
+        {"shortcode": "V1A", "caption": "本文A https://a.rakuten.co.jp/x"},
+        {"shortcode": "V1B", "caption": None},
+    ]
+
+
+def test_iter_feed_posts_graphql_shape():
+    posts = list(iter_feed_posts(json.dumps(GRAPHQL_PAYLOAD)))
+    assert posts == [
+        {"shortcode": "GQA", "caption": "本文GQ"},
+        {"shortcode": "GQB", "caption": None},
+    ]
+
+
+def test_iter_feed_posts_prefix_and_concatenated_documents():
+    body = "for (;;);" + json.dumps(V1_PAYLOAD) + "\n" + json.dumps(GRAPHQL_PAYLOAD)
+    shortcodes = [p["shortcode"] for p in iter_feed_posts(body.encode("utf-8"))]
+    assert shortcodes == ["V1A", "V1B", "GQA", "GQB"]
+
+
+def test_iter_feed_posts_skips_carousel_children():
+    payload = {"items": [{
+        "code": "PARENT",
+        "caption": {"text": "まとめ投稿"},
+        "carousel_media": [
+            {"code": "CHILD1", "media_type": 1},
+            {"code": "CHILD2", "media_type": 2},
+        ],
+    }]}
+    assert list(iter_feed_posts(json.dumps(payload))) == [{"shortcode": "PARENT", "caption": "まとめ投稿"}]
+
+
+class FakePerformanceDriver:
+    """
+    performance ログと Network.getResponseBody だけを再現する偽driver
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.bodies = {}
+
+    def event(self, method, **params):
+        self.entries.append({"message": json.dumps({"message": {"method": method, "params": params}})})
+
+    def feed(self, request_id, payload, url="https://www.instagram.com/api/v1/tags/x/sections/", failed=False):
+        self.bodies[request_id] = json.dumps(payload)
+        self.event("Network.responseReceived", requestId=request_id,
+                   response={"url": url, "mimeType": "application/json"})
+        self.event("Network.loadingFailed" if failed else "Network.loadingFinished", requestId=request_id)
+
+    def get_log(self, kind):
+        entries, self.entries = self.entries, []
+        return entries
+
+    def execute_cdp_cmd(self, cmd, params):
+        if cmd == "Network.getResponseBody":
+            return {"body": self.bodies[params["requestId"]], "base64Encoded": False}
+        return {}
+
+
+def test_feed_capture_poll_dedups_across_responses():
+    driver = FakePerformanceDriver()
+    capture = FeedCapture(driver, lambda msg: None)
+    capture.start()
+
+    driver.feed("1", V1_PAYLOAD)
+    assert [p["shortcode"] for p in capture.poll()] == ["V1A", "V1B"]
+
+    # 同じ投稿を含む応答を再受信しても新規分だけ返す
+    driver.feed("2", V1_PAYLOAD)
+    driver.feed("3", GRAPHQL_PAYLOAD)
+    assert [p["shortcode"] for p in capture.poll()] == ["GQA", "GQB"]
+    assert capture.payload_count == 3
+
+
+def test_feed_capture_poll_ignores_failed_loads():
+    driver = FakePerformanceDriver()
+    capture = FeedCapture(driver, lambda msg: None)
+    capture.start()
+
+    driver.feed("1", V1_PAYLOAD, failed=True)
+    assert capture.poll() == []
+    assert capture.payload_count == 0
+    assert capture._pending == {}
+
+
+def test_replay_server_serves_recorded_payload_as_feed_response(tmp_path):
+    recorded = json.dumps(GRAPHQL_PAYLOAD, ensure_ascii=False).encode("utf-8")
+    (tmp_path / "feed_0001.json").write_bytes(recorded)
+
+    server = feed_replay_server.serve(tmp_path, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address[:2]
+        url = f"http://{host}:{port}/api/v1/replay/0"
+        with urllib.request.urlopen(url) as res:
+            body = res.read()
+            mime = res.headers["Content-Type"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert body == recorded
+    assert _is_feed_response({"url": url, "mimeType": mime})
+
+
+def test_crawl_posts_capture_only_opens_posts_without_payload_text(monkeypatch):
+    import browser.capture_feed
+
+    captured = [
+        {"url": "https://www.instagram.com/p/A/", "text": "本文 https://a.rakuten.co.jp/a"},
+        {"url": "https://www.instagram.com/p/B/", "text": ""},
+        {"url": "https://www.instagram.com/p/C/", "text": "楽天リンクなし"},
+        {"url": "https://www.instagram.com/p/D/", "text": None},
+    ]
+    opened = []
+
+    def fake_get_post_texts(driver, post_links, max_count=5):
+        opened.extend(post_links)
+        return [{"url": u, "text": "投稿ページ https://a.rakuten.co.jp/d"} for u in post_links]
+
+    # selenium を読み込まないよう投稿ページ取得モジュールを差し替える
+    fake_module = types.ModuleType("browser.fetch_post_texts")
+    fake_module.TARGET_LINK_KEY = "https://a.rakuten."
+    fake_module.get_post_texts = fake_get_post_texts
+    monkeypatch.setitem(sys.modules, "browser.fetch_post_texts", fake_module)
+    monkeypatch.setattr(browser.capture_feed, "capture_tag_posts", lambda *args, **kwargs: captured)
+
+    result = pipeline.crawl_posts(object(), "楽天room", 4, lambda msg: None, capture=True)
+
+    assert opened == ["https://www.instagram.com/p/D/"]
+    assert [r["url"] for r in result] == ["https://www.instagram.com/p/A/", "https://www.instagram.com/p/D/"]
@@ -0,0 +1,99 @@
+"""
+test_heavy_hitters.py
+
+SpaceSaving のマージ後も誤差保証（真の回数 ∈ [登場回数 - 誤差, 登場回数]、誤差 ≤ N / capacity）
+が成り立つことと、上位件数・容量の指定が1未満なら拒否されることを確認する回帰テスト
+"""
+
+import random
+from collections import Counter
+
+import pytest
+
+from aggregator.heavy_hitters import SpaceSaving, merge_sketches, rank_top_k
+from main import build_arg_parser
+from pipeline import build_ranking
+
+
+def assert_bounds(sketch: SpaceSaving, exact: Counter) -> None:
+    assert sketch.n == sum(exact.values())
+    for item, count, error in sketch.top():
+        assert count - error <= exact[item] <= count, (item, count, error, exact[item])
+        assert count - exact[item] <= sketch.error_bound()
+
+
+def test_merge_mixed_capacities_keeps_bounds():
+    # 追い出し済みの小容量スケッチと、空きのある大容量スケッチのマージ
+    parts = ["xyzz", "q", "xx"]
+    merged = merge_sketches([SpaceSaving(2).update_many(parts[0]),
+                             SpaceSaving(4).update_many(parts[1]),
+                             SpaceSaving(4).update_many(parts[2])])
+    assert merged.capacity == 2
+    assert_bounds(merged, Counter("".join(parts)))
+
+
+def test_merge_randomized_capacities_keeps_bounds():
+    rng = random.Random(0)
+    for _ in range(300):
+        parts = [[f"id{int(rng.paretovariate(1.2))}" for _ in range(rng.randint(0, 60))]
+                 for _ in range(rng.randint(2, 4))]
+        sketches = [SpaceSaving(rng.randint(1, 8)).update_many(p) for p in parts]
+        merged = merge_sketches(SpaceSaving.from_dict(s.to_dict()) for s in sketches)
+        assert_bounds(merged, Counter(i for p in parts for i in p))
+
+
+@pytest.mark.parametrize("k", [0, -1])
+def test_top_k_below_one_is_rejected(k):
+    sketch = SpaceSaving(4).update_many("aabbc")
+    with pytest.raises(ValueError):
+        sketch.top(k)
+    with pytest.raises(ValueError):
+        rank_top_k(sketch, k)
+    with pytest.raises(ValueError):
+        build_ranking(sketch, lambda msg: None, with_titles=False, top_k=k)
+    with pytest.raises(ValueError):
+        build_ranking(list("aabbc"), lambda msg: None, with_titles=False, top_k=k)
+
+
+def test_top_without_k_returns_all_counters():
+    sketch = SpaceSaving(4).update_many("aabbc")
+    assert [item for item, _, _ in sketch.top()] == ["a", "b", "c"]
+    assert len(build_ranking(sketch, lambda msg: None, with_titles=False)) == 3
+
+
+@pytest.mark.parametrize("argv", [
+    ["run", "--top-k", "0"],
+    ["rank", "urls.json", "--top-k", "-1"],
+    ["rank", "urls.json", "--top-k", "5", "--capacity", "0"],
+    ["extract", "posts.json", "--sketch", "s.json", "--capacity", "0"],
+    ["rank", "urls.json", "--top-k", "x"],
+])
+def test_cli_rejects_non_positive_top_k_and_capacity(argv, capsys):
+    with pytest.raises(SystemExit):
+        build_arg_parser().parse_args(argv)
+    assert "--" in capsys.readouterr().err
+
+
+def test_run_with_top_k_streams_urls_into_sketch(tmp_path, monkeypatch):
+    import types
+
+    import main
+    import pipeline
+
+    posts = [{"url": "https://www.instagram.com/p/A/", "text": "https://item.rakuten.co.jp/shop/a/"}] * 3
+    seen = {}
+
+    def fake_build_ranking(all_urls, log, **kwargs):
+        seen["all_urls"] = all_urls
+        return build_ranking(all_urls, log, with_titles=False, **kwargs)
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "_load_crawl_config", lambda args: ("user", "pass", "楽天room", 3))
+    monkeypatch.setattr(pipeline, "run_crawl", lambda *args, **kwargs: posts)
+    monkeypatch.setattr(pipeline, "build_ranking", fake_build_ranking)
+
+    main.cmd_run(build_arg_parser().parse_args(["run", "--top-k", "1"]), "test", lambda msg: None)
+
+    # URL一覧のリストを作らず、ジェネレータのままスケッチへ渡す
+    assert isinstance(seen["all_urls"], types.GeneratorType)
+    assert (tmp_path / "csv" / "商品ランキング_test.csv").exists()
@@ -0,0 +1,56 @@
+"""
+datafile.py
+中間データ（投稿本文・正規化URL）をJSONファイルで受け渡すユーティリティ
+
+このモジュールは以下の責任を持つ：
+1. サブコマンド間で受け渡す中間データを json/ ディレクトリに保存する
+2. 保存済みJSONを読み込み、次のステップへ渡す
+3. 標準ライブラリのみで動作し、重い依存を読み込まない
+"""
+
+import json
+from pathlib import Path
+
+JSON_DIR = Path("json")
+
+
+def default_json_path(prefix: str, now: str) -> Path:
+    """
+    中間データの既定保存先（json/{prefix}_{now}.json）を返す
+    """
+    return JSON_DIR / f"{prefix}_{now}.json"
+
+
+def save_json(data, path, log) -> Path:
+    """
+    データをUTF-8のJSONファイルとして保存する
+
+    Parameters:
+        data: JSON化可能なオブジェクト（list / dict）
+        path (str or Path): 保存先
+        log (function): ログ出力関数
+
+    Returns:
+        Path: 保存先パス
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    log(f"💾 JSON保存完了: {path}（{len(data)} 件）")
+    return path
+
+
+def load_json(path, log):
+    """
+    JSONファイルを読み込んで返す
+
+    Parameters:
+        path (str or Path): 読み込むファイル
+        log (function): ログ出力関数
+    """
+    path = Path(path)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    log(f"📂 JSON読み込み完了: {path}（{len(data)} 件）")
+    return data